@@ -1,305 +1,423 @@
-import subprocess
-import threading
-import time
-from datetime import datetime, timedelta
-from pathlib import Path
-from typing import Iterable, List
-
-from .config import settings
-
-
-class FFmpegBufferManager:
-    """Manages an FFmpeg process that segments the live stream into MP3 files
-    and provides utilities to retrieve the latest N minutes of audio.
-    """
-
-    def __init__(self) -> None:
-        self.buffer_dir: Path = settings.BUFFER_DIR
-        self.segment_seconds: int = settings.SEGMENT_SECONDS
-        self.buffer_minutes: int = settings.BUFFER_MINUTES
-        self.cleanup_margin_minutes: int = settings.CLEANUP_MARGIN_MINUTES
-        self.ffmpeg_path: str = settings.FFMPEG_PATH
-        self.stream_url: str = settings.STREAM_URL
-        self.audio_bitrate_bps: int = settings.AUDIO_BITRATE
-
-        self._stop_event = threading.Event()
-        self._ffmpeg_process: subprocess.Popen | None = None
-        self._monitor_thread: threading.Thread | None = None
-        self._cleaner_thread: threading.Thread | None = None
-
-    def start(self) -> None:
-        if self._monitor_thread and self._monitor_thread.is_alive():
-            return
-        self._stop_event.clear()
-        self._monitor_thread = threading.Thread(target=self._run_monitor, daemon=True)
-        self._monitor_thread.start()
-        # Start cleaner thread
-        self._cleaner_thread = threading.Thread(target=self._run_cleaner, daemon=True)
-        self._cleaner_thread.start()
-
-    def stop(self) -> None:
-        self._stop_event.set()
-        proc = self._ffmpeg_process
-        if proc and proc.poll() is None:
-            try:
-                proc.terminate()
-                try:
-                    proc.wait(timeout=5)
-                except subprocess.TimeoutExpired:
-                    proc.kill()
-            except Exception:
-                pass
-
-    # ---------------------- Internal threads ----------------------
-    def _run_monitor(self) -> None:
-        while not self._stop_event.is_set():
-            self._launch_ffmpeg()
-            # Wait until process exits or stop requested
-            while not self._stop_event.is_set():
-                proc = self._ffmpeg_process
-                if proc is None:
-                    break
-                if proc.poll() is not None:
-                    # exited; check for errors
-                    returncode = proc.returncode
-                    stderr_data = b""
-                    if proc.stderr:
-                        try:
-                            stderr_data = proc.stderr.read()
-                        except Exception:
-                            pass
-                    if returncode != 0:
-                        error_msg = stderr_data.decode("utf-8", errors="ignore")[:500] if stderr_data else "Unknown error"
-                        print(f"[FFMPEG] Process exited with code {returncode}: {error_msg}")
-                    else:
-                        print(f"[FFMPEG] Process exited normally (code 0)")
-                    # break to relaunch
-                    break
-                time.sleep(1)
-            # Give a moment before relaunch
-            if not self._stop_event.is_set():
-                print(f"[FFMPEG] Waiting 2 seconds before relaunch...")
-                time.sleep(2)
-
-    def _launch_ffmpeg(self) -> None:
-        # Ensure directory exists
-        self.buffer_dir.mkdir(parents=True, exist_ok=True)
-        # Build FFmpeg command to segment into MP3 chunks
-        # Using strftime to include timestamps in filenames
-        output_pattern = str(self.buffer_dir / "seg_%Y%m%d_%H%M%S.mp3")
-        cmd = [
-            self.ffmpeg_path,
-            "-hide_banner",
-            "-loglevel",
-            "warning",
-            "-nostdin",
-            # Reconnect options for live HTTP streams
-            "-reconnect",
-            "1",
-            "-reconnect_streamed",
-            "1",
-            "-reconnect_at_eof",
-            "1",
-            "-reconnect_delay_max",
-            "5",
-            "-i",
-            self.stream_url,
-            # Normalize to mp3 for consistent segments
-            "-c:a",
-            "libmp3lame",
-            "-b:a",
-            "128k",
-            "-ar",
-            "44100",
-            # Segmenting config
-            "-f",
-            "segment",
-            "-segment_time",
-            str(self.segment_seconds),
-            "-reset_timestamps",
-            "1",
-            "-strftime",
-            "1",
-            output_pattern,
-        ]
-        try:
-            print(f"[FFMPEG] Starting segmenter: segment_time={self.segment_seconds}s, output_pattern={output_pattern}")
-            self._ffmpeg_process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.PIPE,  # Capture stderr to check for errors
-            )
-            print(f"[FFMPEG] Process started (PID: {self._ffmpeg_process.pid})")
-        except FileNotFoundError as exc:
-            # FFmpeg not installed or path invalid; sleep to avoid tight loop
-            print(f"[FFMPEG] FFmpeg not found: {exc}")
-            time.sleep(5)
-        except Exception as exc:
-            print(f"[FFMPEG] Failed to start FFmpeg: {exc}")
-            time.sleep(5)
-
-    def _run_cleaner(self) -> None:
-        """Periodically remove old segments beyond the rolling window."""
-        while not self._stop_event.is_set():
-            try:
-                self._cleanup_old_segments()
-            except Exception:
-                pass
-            # Clean every 30 seconds
-            self._stop_event.wait(30)
-
-    def _cleanup_old_segments(self) -> None:
-        keep_minutes = self.buffer_minutes + self.cleanup_margin_minutes
-        # Use file mtime instead of parsed timestamps to avoid timezone issues
-        # Calculate cutoff as seconds since epoch
-        now_ts = time.time()
-        cutoff_ts = now_ts - (keep_minutes * 60)
-        
-        all_segments = list(self._iter_segment_files())
-        deleted_count = 0
-        kept_count = 0
-        
-        for path in all_segments:
-            try:
-                # Use file modification time (mtime) which is always accurate
-                mtime_ts = path.stat().st_mtime
-                if mtime_ts < cutoff_ts:
-                    # File is older than cutoff, delete it
-                    path.unlink(missing_ok=True)
-                    deleted_count += 1
-                else:
-                    kept_count += 1
-            except Exception as e:
-                print(f"[CLEANER] Error processing {path}: {e}")
-                pass
-        
-        if deleted_count > 0:
-            print(f"[CLEANER] Deleted {deleted_count} old segments (kept {kept_count}, cutoff: {keep_minutes} minutes ago)")
-        elif len(all_segments) > 0:
-            print(f"[CLEANER] Checked {len(all_segments)} segments, all within retention window (kept {kept_count})")
-
-    # ---------------------- Public helpers ----------------------
-    def recent_segments_for_minutes(self, minutes: int) -> List[Path]:
-        """Return oldest-first list of segments covering the requested duration.
-        
-        Simple approach: exclude in-progress segments, then take the most recent
-        N segments that would cover the requested time window.
-        """
-        print(f"[BUFFER] recent_segments_for_minutes called with minutes={minutes}, segment_seconds={self.segment_seconds}")
-        
-        if minutes <= 0:
-            print(f"[BUFFER] Invalid minutes: {minutes}, returning empty list")
-            return []
-        
-        # Exclude segments modified in the last 2 seconds (likely still being written)
-        # Use time.time() for consistency with file mtime (both are epoch timestamps)
-        now_ts = time.time()
-        cutoff_ts = now_ts - 2.0
-        
-        stable_segments: List[tuple[Path, datetime]] = []
-        all_files = list(self._iter_segment_files())
-        print(f"[BUFFER] Found {len(all_files)} total segment files")
-        
-        for path in all_files:
-            try:
-                # Check file size first - exclude empty files
-                stat_info = path.stat()
-                file_size = stat_info.st_size
-                if file_size == 0:
-                    print(f"[BUFFER] Skipping empty file: {path.name}")
-                    continue
-                
-                # Check if file is stable (not recently modified)
-                mtime_ts = stat_info.st_mtime
-                age_seconds = now_ts - mtime_ts
-                if mtime_ts >= cutoff_ts:
-                    print(f"[BUFFER] Skipping in-progress file: {path.name} (age: {age_seconds:.2f}s, size: {file_size} bytes)")
-                    continue  # Skip in-progress files
-                
-                # Try to get timestamp from filename (more accurate)
-                ts = self._timestamp_from_name(path.name)
-                if ts is None:
-                    # Fallback to mtime
-                    ts = datetime.utcfromtimestamp(mtime_ts)
-                
-                stable_segments.append((path, ts))
-                print(f"[BUFFER] Added stable segment: {path.name} (age: {age_seconds:.2f}s, size: {file_size} bytes)")
-            except Exception as e:
-                print(f"[BUFFER] Error processing {path}: {e}")
-                continue
-        
-        print(f"[BUFFER] Found {len(stable_segments)} stable segments")
-        
-        if not stable_segments:
-            print(f"[BUFFER] No stable segments found, returning empty list")
-            return []
-        
-        # Sort by timestamp, newest first
-        stable_segments.sort(key=lambda x: x[1], reverse=True)
-        
-        # Calculate how many segments we need
-        target_seconds = minutes * 60
-        segments_needed_raw = target_seconds / self.segment_seconds
-        # Add just 1 extra segment as a small safety margin (instead of 20% + 2)
-        # This should get us very close to the requested duration
-        segments_needed = int(segments_needed_raw) + 1
-        
-        print(f"[BUFFER] Target: {target_seconds}s, Segments needed: {segments_needed} (raw: {segments_needed_raw:.2f})")
-        print(f"[BUFFER] Available stable segments: {len(stable_segments)}")
-        
-        # Take the most recent N segments, but don't exceed what's available
-        segments_to_take = min(segments_needed, len(stable_segments))
-        selected = stable_segments[:segments_to_take]
-        
-        if len(selected) < segments_needed:
-            print(f"[BUFFER] WARNING: Only {len(selected)} segments available, but {segments_needed} were requested")
-            print(f"[BUFFER] This will result in ~{len(selected) * self.segment_seconds}s of audio instead of {target_seconds}s")
-        else:
-            print(f"[BUFFER] Selected {len(selected)} segments (requested {segments_needed})")
-        
-        # Sort oldest-first for proper concatenation order
-        selected.sort(key=lambda x: x[1])
-        
-        if selected:
-            oldest = selected[0][1]
-            newest = selected[-1][1]
-            span_seconds = (newest - oldest).total_seconds()
-            print(f"[BUFFER] Selected segment span: {span_seconds:.2f}s (from {oldest.strftime('%H:%M:%S')} to {newest.strftime('%H:%M:%S')})")
-        
-        return [path for path, _ in selected]
-
-    # ---------------------- Utilities ----------------------
-    def _iter_segment_files(self) -> Iterable[Path]:
-        if not self.buffer_dir.exists():
-            return []
-        return [p for p in self.buffer_dir.glob("seg_*.mp3") if p.is_file()]
-
-    @staticmethod
-    def _timestamp_from_name(name: str) -> datetime | None:
-        # Expect format: seg_%Y%m%d_%H%M%S.mp3
-        try:
-            stem = name.split(".")[0]
-            _, ts = stem.split("_", 1)
-            return datetime.strptime(ts, "%Y%m%d_%H%M%S")
-        except Exception:
-            return None
-
-    def _duration_for_file(self, path: Path) -> float:
-        """Estimate duration from file size and configured bitrate.
-
-        This avoids reliance on ffprobe timing headers which can be unreliable
-        for very short MP3 segments. Falls back to configured segment_seconds
-        if size is unavailable or bitrate is not positive.
-        """
-        try:
-            size_bytes = path.stat().st_size
-            if size_bytes > 0 and self.audio_bitrate_bps > 0:
-                return (size_bytes * 8.0) / float(self.audio_bitrate_bps)
-        except Exception:
-            pass
-        return float(self.segment_seconds)
-
-
-# Singleton manager instance used by the app
-buffer_manager = FFmpegBufferManager()
-
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, List, NamedTuple
+
+from .config import settings
+
+
+log = logging.getLogger(__name__)
+
+
+class _SegmentEntry(NamedTuple):
+    """A segment file as tracked by the in-memory index."""
+
+    name: str
+    path: str
+    ts: datetime
+    mtime: float
+    size: int
+    seq: int
+
+
+class FFmpegBufferManager:
+    """Manages an FFmpeg process that segments the live stream into MP3 files
+    and provides utilities to retrieve the latest N minutes of audio.
+    """
+
+    def __init__(self) -> None:
+        self.buffer_dir: Path = settings.BUFFER_DIR
+        # BUFFER_DIR is resolved at config load; cache the absolute string so
+        # recurring scans and joins never go back through pathlib.
+        self._buffer_dir_str: str = str(self.buffer_dir)
+        self.segment_seconds: int = settings.SEGMENT_SECONDS
+        self.buffer_minutes: int = settings.BUFFER_MINUTES
+        self.cleanup_margin_minutes: int = settings.CLEANUP_MARGIN_MINUTES
+        self.ffmpeg_path: str = settings.FFMPEG_PATH
+        self.stream_url: str = settings.STREAM_URL
+        self.audio_bitrate_bps: int = settings.AUDIO_BITRATE
+
+        self._stop_event = asyncio.Event()
+        self._ffmpeg_process: asyncio.subprocess.Process | None = None
+        self._monitor_task: asyncio.Task | None = None
+        self._cleaner_task: asyncio.Task | None = None
+        self._watcher_task: asyncio.Task | None = None
+        # Ordered oldest-first; filenames embed the timestamp so name order
+        # is chronological order. Each entry gets a monotonically increasing
+        # sequence number for HLS playlists.
+        self._index: deque[_SegmentEntry] = deque()
+        self._seq_counter: int = 0
+
+        # The segmenter command is fully determined by settings; build it once
+        # instead of on every (re)launch.
+        self._segment_cmd: List[str] = self._build_segment_cmd()
+
+    def _build_segment_cmd(self) -> List[str]:
+        # Build FFmpeg command to segment into MP3 chunks
+        # Using strftime to include timestamps in filenames
+        output_pattern = str(self.buffer_dir / "seg_%Y%m%d_%H%M%S.mp3")
+        return [
+            self.ffmpeg_path,
+            "-hide_banner",
+            "-loglevel",
+            "warning",
+            "-nostdin",
+            # Reconnect options for live HTTP streams
+            "-reconnect",
+            "1",
+            "-reconnect_streamed",
+            "1",
+            "-reconnect_at_eof",
+            "1",
+            "-reconnect_delay_max",
+            "5",
+            "-i",
+            self.stream_url,
+            # Normalize to mp3 for consistent segments
+            "-c:a",
+            "libmp3lame",
+            "-b:a",
+            "128k",
+            "-ar",
+            "44100",
+            # Segmenting config
+            "-f",
+            "segment",
+            "-segment_time",
+            str(self.segment_seconds),
+            "-reset_timestamps",
+            "1",
+            "-strftime",
+            "1",
+            output_pattern,
+        ]
+
+    async def start(self) -> None:
+        if self._monitor_task and not self._monitor_task.done():
+            return
+        self._stop_event.clear()
+        self._monitor_task = asyncio.create_task(self._run_monitor())
+        # Start cleaner task
+        self._cleaner_task = asyncio.create_task(self._run_cleaner())
+        # Start watcher task maintaining the in-memory segment index
+        self._watcher_task = asyncio.create_task(self._run_watcher())
+
+    async def stop(self) -> None:
+        self._stop_event.set()
+        proc = self._ffmpeg_process
+        if proc and proc.returncode is None:
+            try:
+                proc.terminate()
+                try:
+                    await asyncio.wait_for(proc.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    proc.kill()
+            except ProcessLookupError:
+                pass
+        for task in (self._monitor_task, self._cleaner_task, self._watcher_task):
+            if task and not task.done():
+                try:
+                    await asyncio.wait_for(task, timeout=5)
+                except asyncio.TimeoutError:
+                    task.cancel()
+
+    @staticmethod
+    async def _drain_stderr(stream: asyncio.StreamReader, tail: deque[bytes]) -> None:
+        try:
+            while True:
+                chunk = await stream.read(4096)
+                if not chunk:
+                    break
+                tail.append(chunk)
+        except Exception:
+            pass
+
+    async def _wait_for_stop(self, timeout: float) -> None:
+        """Sleep up to ``timeout`` seconds, returning early if stop is requested."""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    # ---------------------- Internal tasks ----------------------
+    async def _run_monitor(self) -> None:
+        while not self._stop_event.is_set():
+            proc = await self._launch_ffmpeg()
+            if proc is not None:
+                # Drain stderr while the process runs: if nobody reads the
+                # pipe a chatty ffmpeg eventually blocks writing to it. Only
+                # the most recent chunks are kept for diagnostics.
+                stderr_tail: deque[bytes] = deque(maxlen=8)
+                drain_task = None
+                if proc.stderr:
+                    drain_task = asyncio.create_task(
+                        self._drain_stderr(proc.stderr, stderr_tail)
+                    )
+                # stop() terminates the process, so this returns promptly on
+                # shutdown as well as on crashes.
+                await proc.wait()
+                if drain_task:
+                    await drain_task
+                returncode = proc.returncode
+                if returncode != 0:
+                    stderr_data = b"".join(stderr_tail)
+                    error_msg = stderr_data.decode("utf-8", errors="ignore")[-500:] if stderr_data else "Unknown error"
+                    log.warning("ffmpeg exited with code %s: %s", returncode, error_msg)
+                else:
+                    log.info("ffmpeg exited normally (code 0)")
+                self._ffmpeg_process = None
+            # Give a moment before relaunch
+            if not self._stop_event.is_set():
+                log.info("Waiting 2 seconds before ffmpeg relaunch")
+                await self._wait_for_stop(2)
+
+    async def _launch_ffmpeg(self) -> asyncio.subprocess.Process | None:
+        # The buffer directory is created once at config import; no need to
+        # re-walk and re-stat the path on every relaunch.
+        try:
+            log.info(
+                "Starting segmenter: segment_time=%ss, output_pattern=%s",
+                self.segment_seconds,
+                self._segment_cmd[-1],
+            )
+            proc = await asyncio.create_subprocess_exec(
+                *self._segment_cmd,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,  # Capture stderr to check for errors
+            )
+            self._ffmpeg_process = proc
+            log.info("ffmpeg started (PID %s)", proc.pid)
+            return proc
+        except FileNotFoundError as exc:
+            # FFmpeg not installed or path invalid; sleep to avoid tight loop
+            log.error("FFmpeg not found: %s", exc)
+            await self._wait_for_stop(5)
+        except Exception as exc:
+            log.error("Failed to start FFmpeg: %s", exc)
+            await self._wait_for_stop(5)
+        return None
+
+    async def _run_watcher(self) -> None:
+        """Keep the in-memory segment index in sync with the buffer directory.
+
+        ffmpeg creates segments at a fixed cadence, so scanning once per
+        segment interval is enough to pick up new files; requests are then
+        served from memory instead of re-enumerating the directory each time.
+        """
+        while not self._stop_event.is_set():
+            try:
+                self._refresh_index()
+            except Exception as e:
+                log.warning("Segment index refresh failed: %s", e)
+            await self._wait_for_stop(max(self.segment_seconds, 1))
+
+    def _refresh_index(self) -> None:
+        last_name = self._index[-1].name if self._index else ""
+        new_entries: List[_SegmentEntry] = []
+        for entry in self._iter_segment_files():
+            if entry.name > last_name:
+                st = entry.stat()
+                ts = self._timestamp_from_name(entry.name)
+                if ts is None:
+                    ts = datetime.utcfromtimestamp(st.st_mtime)
+                new_entries.append(
+                    _SegmentEntry(entry.name, entry.path, ts, st.st_mtime, st.st_size, 0)
+                )
+            elif entry.name == last_name:
+                # The previously-newest segment may still have been open when
+                # it was indexed; refresh its size/mtime.
+                st = entry.stat()
+                self._index[-1] = self._index[-1]._replace(mtime=st.st_mtime, size=st.st_size)
+        if new_entries:
+            new_entries.sort()
+            for e in new_entries:
+                self._index.append(e._replace(seq=self._seq_counter))
+                self._seq_counter += 1
+
+    async def _run_cleaner(self) -> None:
+        """Periodically remove old segments beyond the rolling window."""
+        while not self._stop_event.is_set():
+            try:
+                self._cleanup_old_segments()
+            except Exception:
+                pass
+            # Clean every 30 seconds
+            await self._wait_for_stop(30)
+
+    def _cleanup_old_segments(self) -> None:
+        keep_minutes = self.buffer_minutes + self.cleanup_margin_minutes
+        # Use file mtime instead of parsed timestamps to avoid timezone issues
+        # Calculate cutoff as seconds since epoch
+        now_ts = time.time()
+        cutoff_ts = now_ts - (keep_minutes * 60)
+        
+        deleted_count = 0
+        
+        # The index is ordered oldest-first, so expired entries form a prefix:
+        # pop from the left until we reach the retention window.
+        while self._index and self._index[0].mtime < cutoff_ts:
+            entry = self._index.popleft()
+            try:
+                os.unlink(entry.path)
+                deleted_count += 1
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                log.warning("Error deleting %s: %s", entry.name, e)
+        
+        if deleted_count > 0:
+            log.debug(
+                "Deleted %d old segments (kept %d, cutoff: %d minutes ago)",
+                deleted_count,
+                len(self._index),
+                keep_minutes,
+            )
+
+    # ---------------------- Public helpers ----------------------
+    def recent_segments_for_minutes(self, minutes: int) -> List[Path]:
+        """Return oldest-first list of segments covering the requested duration.
+        
+        Simple approach: exclude in-progress segments, then take the most recent
+        N segments that would cover the requested time window.
+        """
+        if minutes <= 0:
+            return []
+        
+        # Calculate how many segments we need
+        target_seconds = minutes * 60
+        # Add just 1 extra segment as a small safety margin (instead of 20% + 2)
+        # This should get us very close to the requested duration
+        segments_needed = target_seconds // self.segment_seconds + 1
+        
+        # Only the newest segment can be in progress, so one quiescence check
+        # on it replaces the old blanket "skip anything modified in the last
+        # 2 seconds" filter — and stops throwing away stable audio.
+        skip_tail = self._tail_in_progress()
+        
+        # The index is already chronological, so walk it from the newest end
+        # and stop once we have enough — O(k) instead of filtering and
+        # sorting the whole window.
+        selected: List[str] = []
+        for i, entry in enumerate(reversed(self._index)):
+            if i == 0 and skip_tail:
+                continue
+            if entry.size > 0:
+                selected.append(entry.path)
+                if len(selected) == segments_needed:
+                    break
+        
+        if not selected:
+            log.debug("No stable segments available")
+            return []
+        
+        if len(selected) < segments_needed:
+            log.debug(
+                "Only %d of %d requested segments available (~%ds of %ds)",
+                len(selected),
+                segments_needed,
+                len(selected) * self.segment_seconds,
+                target_seconds,
+            )
+        
+        # Collected newest-first; reverse to oldest-first for concatenation
+        # and wrap in Path only at the public boundary
+        return [Path(path) for path in reversed(selected)]
+
+    def live_playlist(self, max_segments: int = 6) -> tuple[int, List[tuple[str, float]]]:
+        """Return ``(media_sequence, [(name, duration_seconds), ...])`` for a
+        sliding-window HLS playlist over the newest stable segments.
+
+        Durations are estimated from segment size and the configured bitrate,
+        matching _duration_for_file.
+        """
+        entries = list(self._index)
+        if entries and self._tail_in_progress():
+            entries.pop()
+        window = [entry for entry in entries if entry.size > 0][-max_segments:]
+        if not window:
+            return 0, []
+        return window[0].seq, [
+            (entry.name, self._duration_for_size(entry.size)) for entry in window
+        ]
+
+    def _tail_in_progress(self) -> bool:
+        """Return True if the newest indexed segment is likely still open.
+
+        ``ffmpeg -f segment`` writes exactly one file at a time and closes
+        each segment before opening the next, so at most the newest entry can
+        be in progress. One fresh stat on that file is enough to decide.
+        """
+        if not self._index:
+            return False
+        try:
+            mtime = os.stat(self._index[-1].path).st_mtime
+        except OSError:
+            # Can't verify; treat it as in progress and skip it
+            return True
+        return mtime > time.time() - self.segment_seconds
+
+    # ---------------------- Utilities ----------------------
+    def _iter_segment_files(self) -> Iterable[os.DirEntry]:
+        """Yield DirEntry objects for segment files.
+
+        scandir enumerates the directory in one pass and DirEntry caches the
+        stat result, so callers get mtime/size without a second syscall per
+        file.
+        """
+        try:
+            entries = os.scandir(self._buffer_dir_str)
+        except FileNotFoundError:
+            return
+        with entries:
+            for entry in entries:
+                if (
+                    entry.name.startswith("seg_")
+                    and entry.name.endswith(".mp3")
+                    and entry.is_file(follow_symlinks=False)
+                ):
+                    yield entry
+
+    @staticmethod
+    def _timestamp_from_name(name: str) -> datetime | None:
+        # Expect format: seg_%Y%m%d_%H%M%S.mp3
+        # Parsed once per segment at index insertion, so keep it cheap: slice
+        # the fixed-width fields directly instead of going through strptime.
+        try:
+            stem = name.split(".")[0]
+            return datetime(
+                int(stem[4:8]),
+                int(stem[8:10]),
+                int(stem[10:12]),
+                int(stem[13:15]),
+                int(stem[15:17]),
+                int(stem[17:19]),
+            )
+        except Exception:
+            return None
+
+    def _duration_for_file(self, path: str | Path) -> float:
+        """Estimate duration from file size and configured bitrate.
+
+        This avoids reliance on ffprobe timing headers which can be unreliable
+        for very short MP3 segments. Falls back to configured segment_seconds
+        if size is unavailable or bitrate is not positive.
+        """
+        try:
+            return self._duration_for_size(os.stat(path).st_size)
+        except Exception:
+            pass
+        return float(self.segment_seconds)
+
+    def _duration_for_size(self, size_bytes: int) -> float:
+        if size_bytes > 0 and self.audio_bitrate_bps > 0:
+            return (size_bytes * 8.0) / float(self.audio_bitrate_bps)
+        return float(self.segment_seconds)
+
+
+# Singleton manager instance used by the app
+buffer_manager = FFmpegBufferManager()
+
@@ -1,21 +1,23 @@
 from __future__ import annotations
 
 import asyncio
+import logging
+import math
 import os
-import subprocess
-import tempfile
 from pathlib import Path
-from typing import AsyncIterator, Iterable, List
+from typing import AsyncIterator, List
 
 import httpx
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 from .config import settings
 from .ffmpeg_buffer import buffer_manager
 
 
+log = logging.getLogger(__name__)
+
 app = FastAPI(title="Live Audio Proxy with Rolling Buffer")
 
 
@@ -31,35 +33,44 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def on_startup() -> None:
-    # Start the FFmpeg segmenter/cleaner threads
-    buffer_manager.start()
+    # Start the FFmpeg segmenter/cleaner tasks on the app's event loop
+    await buffer_manager.start()
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
-    buffer_manager.stop()
+    await buffer_manager.stop()
+    await _upstream_client.aclose()
 
 
 # ---------------------- Live proxy ----------------------
+# Shared across all listeners and reconnects: building an AsyncClient sets up
+# a connection pool and TLS context, and keep-alive lets upstream reconnects
+# skip the TCP handshake. Closed from the shutdown handler.
+_upstream_client = httpx.AsyncClient(
+    timeout=httpx.Timeout(None), headers={"Icy-MetaData": "1"}
+)
+
+
 async def _iter_upstream(url: str) -> AsyncIterator[bytes]:
     # Stream chunks from upstream and yield to client
-    timeout = httpx.Timeout(None)
-    headers = {"Icy-MetaData": "1"}
-    async with httpx.AsyncClient(timeout=timeout, headers=headers) as client:
-        while True:
-            try:
-                async with client.stream("GET", url) as resp:
-                    resp.raise_for_status()
-                    async for chunk in resp.aiter_bytes(8192):
-                        if chunk:
-                            yield chunk
-                        # Allow cancellation
-                        await asyncio.sleep(0)
-            except (httpx.HTTPError, httpx.TransportError):
-                # brief backoff then reconnect
-                await asyncio.sleep(1)
-                continue
-            break
+    while True:
+        try:
+            async with _upstream_client.stream("GET", url) as resp:
+                resp.raise_for_status()
+                # aiter_raw skips httpx's content decoding (the stream is
+                # already raw audio bytes), and 64 KiB chunks mean one
+                # bytes object per 64 KB instead of per 8 KB.
+                # Cancellation is delivered at the async-for suspension
+                # point; no explicit sleep(0) tick is needed.
+                async for chunk in resp.aiter_raw(65536):
+                    if chunk:
+                        yield chunk
+        except (httpx.HTTPError, httpx.TransportError):
+            # brief backoff then reconnect
+            await asyncio.sleep(1)
+            continue
+        break
 
 
 @app.get("/live")
@@ -68,158 +79,93 @@ async def live() -> StreamingResponse:
     return StreamingResponse(_iter_upstream(settings.STREAM_URL), media_type="audio/mpeg")
 
 
+# ---------------------- HLS playback ----------------------
+@app.get("/live.m3u8")
+def live_playlist() -> Response:
+    """Sliding-window HLS playlist over the newest buffered segments.
+
+    Lets HLS-capable clients (hls.js et al.) fetch the already-encoded MP3
+    segments directly instead of going through a per-request remux.
+    """
+    seq, entries = buffer_manager.live_playlist()
+    if not entries:
+        raise HTTPException(status_code=503, detail="Buffer not ready yet; please try again shortly")
+
+    target_duration = max(math.ceil(dur) for _, dur in entries)
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{target_duration}",
+        f"#EXT-X-MEDIA-SEQUENCE:{seq}",
+    ]
+    for name, dur in entries:
+        lines.append(f"#EXTINF:{dur:.3f},")
+        lines.append(f"/segments/{name}")
+    lines.append("")
+    return Response(
+        content="\n".join(lines),
+        media_type="application/vnd.apple.mpegurl",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+@app.get("/segments/{name}")
+def segment(name: str) -> FileResponse:
+    """Serve a single buffered MP3 segment referenced from the playlist."""
+    # Segment names are flat seg_*.mp3 files; reject anything else
+    if not name.startswith("seg_") or not name.endswith(".mp3") or "/" in name or "\\" in name or ".." in name:
+        raise HTTPException(status_code=404, detail="No such segment")
+    path = settings.BUFFER_DIR / name
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="No such segment")
+    return FileResponse(path, media_type="audio/mpeg")
+
+
 # ---------------------- Download last N minutes ----------------------
-def _concat_stream(file_list: List[Path]) -> Iterable[bytes]:
-    if not file_list:
-        print("[CONCAT] Empty file list, returning empty")
-        return []
-    
-    print(f"[CONCAT] Concatenating {len(file_list)} files")
-    
-    # Filter out empty files before concatenation
-    valid_files = []
+async def _concat_stream(file_list: List[Path]) -> AsyncIterator[bytes]:
+    """Yield the segment files back-to-back as one MP3 byte stream.
+
+    Segments are CBR MP3 frames from libmp3lame and each file starts on a
+    frame boundary (``-f segment`` closes one file before opening the next),
+    so byte-level concatenation already produces a valid playable MP3. No
+    ffmpeg remux pass, concat list file, or subprocess is needed.
+
+    The disk reads run via asyncio.to_thread so neither the event loop nor a
+    Starlette worker thread is pinned for the whole download.
+    """
+    # One preallocated buffer reused across all files: readinto() fills it
+    # directly and each chunk is yielded as a zero-copy memoryview slice.
+    # The response writer sends a chunk before pulling the next one, so
+    # reusing the buffer is safe.
+    buf = bytearray(262144)
+    view = memoryview(buf)
+    bytes_yielded = 0
     for p in file_list:
-        if not p.exists():
-            print(f"[CONCAT] Skipping non-existent file: {p.name}")
-            continue
-        size = p.stat().st_size
-        if size == 0:
-            print(f"[CONCAT] Skipping empty file: {p.name}")
+        try:
+            # buffering=0 avoids a second copy through Python's buffered
+            # reader layer
+            f = await asyncio.to_thread(open, p, "rb", 0)
+        except FileNotFoundError:
+            # Segment expired between selection and read; skip it
+            log.debug("Skipping vanished segment: %s", p.name)
             continue
-        valid_files.append(p)
-    
-    if not valid_files:
-        print("[CONCAT] No valid files to concatenate!")
-        return []
-    
-    if len(valid_files) < len(file_list):
-        print(f"[CONCAT] Filtered {len(file_list) - len(valid_files)} empty/invalid files, using {len(valid_files)} valid files")
-    
-    for i, p in enumerate(valid_files[:5]):  # Log first 5
-        print(f"[CONCAT]   File {i+1}: {p.name} ({p.stat().st_size} bytes)")
-    if len(valid_files) > 5:
-        print(f"[CONCAT]   ... and {len(valid_files) - 5} more files")
-    
-    # Create concat demuxer list file (most reliable method)
-    # Use absolute paths with forward slashes and proper escaping
-    list_path = None
-    try:
-        with tempfile.NamedTemporaryFile(
-            mode="w", delete=False, suffix=".txt", newline="\n", encoding="utf-8"
-        ) as f:
-            list_path = Path(f.name)
-            for p in valid_files:
-                # Convert to absolute path and use forward slashes
-                abs_path = p.resolve().as_posix()
-                # Escape single quotes and backslashes for concat demuxer
-                escaped = abs_path.replace("'", "'\\''").replace("\\", "/")
-                f.write(f"file '{escaped}'\n")
-        
-        print(f"[CONCAT] Created concat list file: {list_path}")
-        
-        # Build FFmpeg command using concat demuxer
-        cmd = [
-            settings.FFMPEG_PATH,
-            "-hide_banner",
-            "-loglevel",
-            "error",  # Only show errors
-            "-nostdin",
-            "-f",
-            "concat",
-            "-safe",
-            "0",  # Allow absolute paths
-            "-i",
-            str(list_path),
-            # Use copy codec for speed (segments are already MP3)
-            "-c",
-            "copy",
-            "-f",
-            "mp3",
-            "pipe:1",
-        ]
-        
-        print(f"[CONCAT] Running FFmpeg: {' '.join(cmd[:8])}... (truncated)")
-        proc = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,  # Capture stderr for debugging
-        )
-        print(f"[CONCAT] FFmpeg process started (PID: {proc.pid})")
-    except Exception as exc:
-        print(f"[CONCAT] FFmpeg setup failed: {exc}")
-        if list_path and list_path.exists():
-            list_path.unlink()
-        raise HTTPException(status_code=500, detail=f"FFmpeg setup failed: {exc}")
-
-    def _gen() -> Iterable[bytes]:
-        stderr_data = b""
-        bytes_yielded = 0
         try:
-            assert proc.stdout is not None
-            assert proc.stderr is not None
-            
-            # Read stdout in chunks
             while True:
-                chunk = proc.stdout.read(8192)
-                if not chunk:
+                n = await asyncio.to_thread(f.readinto, buf)
+                if not n:
                     break
-                bytes_yielded += len(chunk)
-                yield chunk
-            
-            print(f"[CONCAT] Yielded {bytes_yielded} bytes total")
-            
-            # Read any remaining stderr (for error detection)
-            stderr_data = proc.stderr.read()
-            if stderr_data:
-                stderr_text = stderr_data.decode("utf-8", errors="ignore")
-                print(f"[CONCAT] FFmpeg stderr: {stderr_text[:500]}")
-        except Exception as e:
-            print(f"[CONCAT] Read exception: {e}")
-            # If read fails, try to get stderr for debugging
-            if proc.stderr:
-                try:
-                    stderr_data = proc.stderr.read()
-                except Exception:
-                    pass
-            raise HTTPException(
-                status_code=500,
-                detail=f"FFmpeg read failed: {e}. stderr: {stderr_data.decode('utf-8', errors='ignore')[:200]}",
-            )
+                bytes_yielded += n
+                yield view[:n]
         finally:
-            # Cleanup
-            try:
-                returncode = proc.wait(timeout=5)
-                print(f"[CONCAT] FFmpeg process finished with returncode {returncode}")
-                if returncode != 0 and stderr_data:
-                    error_msg = stderr_data.decode("utf-8", errors="ignore")[:500]
-                    print(f"[CONCAT] FFmpeg error (returncode {returncode}): {error_msg}")
-            except subprocess.TimeoutExpired:
-                print("[CONCAT] FFmpeg process timeout, killing")
-                proc.kill()
-                proc.wait()
-            except Exception as e:
-                print(f"[CONCAT] Cleanup exception: {e}")
-                try:
-                    proc.kill()
-                except Exception:
-                    pass
-            # Remove temp list file
-            if list_path and list_path.exists():
-                try:
-                    list_path.unlink()
-                    print(f"[CONCAT] Removed temp list file")
-                except Exception as e:
-                    print(f"[CONCAT] Failed to remove temp file: {e}")
-
-    return _gen()
+            f.close()
+    log.debug("Streamed %d bytes from %d segments", bytes_yielded, len(file_list))
 
 
 @app.get("/download")
-def download(minutes: int = Query(2, ge=1, le=30)) -> StreamingResponse:
+async def download(minutes: int = Query(2, ge=1, le=30)) -> StreamingResponse:
     """Download the last N minutes of audio as a single MP3 file."""
-    print(f"[DOWNLOAD] Requested minutes: {minutes} (type: {type(minutes)})")
     files = buffer_manager.recent_segments_for_minutes(minutes)
-    print(f"[DOWNLOAD] Selected {len(files)} segment files")
+    log.debug("Download of %d minutes -> %d segment files", minutes, len(files))
     if not files:
         raise HTTPException(status_code=503, detail="Buffer not ready yet; please try again shortly")
 
@@ -237,18 +183,23 @@ def download(minutes: int = Query(2, ge=1, le=30)) -> StreamingResponse:
 @app.get("/debug/segments")
 def debug_segments(minutes: int = Query(1, ge=1)):
     files = buffer_manager.recent_segments_for_minutes(minutes)
-    return {
-        "count": len(files),
-        "files": [
+    infos = []
+    for f in files:
+        # One os.stat per file; exists() + two .stat() calls did three
+        try:
+            st = os.stat(f)
+            size_bytes, mtime = st.st_size, st.st_mtime
+        except OSError:
+            size_bytes, mtime = 0, 0
+        infos.append(
             {
                 "name": f.name,
-                "size_bytes": f.stat().st_size if f.exists() else 0,
-                "mtime": f.stat().st_mtime if f.exists() else 0,
+                "size_bytes": size_bytes,
+                "mtime": mtime,
                 "path": str(f),
             }
-            for f in files
-        ],
-    }
+        )
+    return {"count": len(files), "files": infos}
 
 
 @app.get("/")